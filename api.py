@@ -4,39 +4,55 @@ Provides REST API endpoints for processing DaVinci Resolve project files.
 """
 
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
+import anyio
+import asyncio
+import logging
 import tempfile
 import zipfile
 import os
 import shutil
 from pathlib import Path
-from io import BytesIO
 import time
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import BinaryIO, Optional, Union
 
 # Import your existing modules
-from drp_io import unpack_drp, repack_drp, cleanup_temp, get_output_name
-from resolve_parse import find_sequence_files, get_timeline_info, save_timeline_xml
+from drp_io import ExtractionBudget, open_member, rewrite_drp, cleanup_temp, get_output_name
+from resolve_parse import (
+    ET, is_sequence_member, parse_timeline_xml, get_timeline_info_from_tree, tree_to_bytes
+)
 from cuts_model import find_clip_pairs, find_eligible_boundaries
 from cuts_transform import apply_cuts_to_timeline
 
+logger = logging.getLogger(__name__)
+
 # Configuration
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
 MAX_EXTRACTED_SIZE = 200 * 1024 * 1024  # 200MB
 ALLOWED_EXTENSIONS = ['.drp']
+_ALLOWED_EXT_TUPLE = tuple(ALLOWED_EXTENSIONS)  # str.endswith takes a tuple
 PROCESSING_TIMEOUT = 30  # seconds
+MAX_TIMELINE_WORKERS = 8  # timelines processed in parallel per request
+MAX_CONCURRENT_JOBS = int(os.getenv("MAX_CONCURRENT_JOBS", "2"))  # requests processed at once
 
 # Initialize FastAPI
 app = FastAPI(
     title="DRP J/L Cut Tool API",
     description="Apply J-cuts and L-cuts to DaVinci Resolve project files",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
+# Concurrency limiting (excess requests wait for a free slot)
+_PROCESS_SEM = asyncio.Semaphore(MAX_CONCURRENT_JOBS)
+
 # Rate limiting
 limiter = Limiter(key_func=get_remote_address)
 app.state.limiter = limiter
@@ -54,29 +70,33 @@ app.add_middleware(
 
 def validate_file_extension(filename: str) -> bool:
     """Validate file has .drp extension"""
-    return any(filename.lower().endswith(ext) for ext in ALLOWED_EXTENSIONS)
+    return filename.lower().endswith(_ALLOWED_EXT_TUPLE)
 
 
-def validate_zip_structure(file_content: bytes) -> tuple:
+def validate_zip_structure(source: Union[str, BinaryIO]) -> tuple:
     """
     Validate ZIP structure to prevent security issues.
+    Reads the archive's central directory in a single pass; source is a
+    path or a seekable binary file object.
+    Zip bombs are caught while members are read, where the real
+    decompressed size is known (see open_member/ExtractionBudget, used by
+    _process_one_seq and rewrite_drp).
     Returns (is_valid, error_message)
     """
     try:
-        with zipfile.ZipFile(BytesIO(file_content)) as zf:
-            # Check for zip bombs (extracted size)
-            total_size = sum(info.file_size for info in zf.infolist())
-            if total_size > MAX_EXTRACTED_SIZE:
-                return False, f"Extracted size ({total_size} bytes) exceeds maximum ({MAX_EXTRACTED_SIZE} bytes)"
+        with zipfile.ZipFile(source) as zf:
+            has_project_xml = False
             
-            # Check for path traversal attacks
             for info in zf.infolist():
+                # Check for path traversal attacks
                 if '..' in info.filename or info.filename.startswith('/'):
                     return False, f"Invalid file path in archive: {info.filename}"
+                
+                if info.filename == 'project.xml':
+                    has_project_xml = True
             
             # Check for required DRP structure
-            filenames = [info.filename for info in zf.infolist()]
-            if 'project.xml' not in filenames:
+            if not has_project_xml:
                 return False, "Invalid DRP structure: missing project.xml"
             
             return True, ""
@@ -87,6 +107,130 @@ def validate_zip_structure(file_content: bytes) -> tuple:
         return False, f"Error validating file: {str(e)}"
 
 
+def _check_deadline(deadline: float) -> None:
+    """Raise TimeoutError once the processing deadline (time.monotonic()) has passed"""
+    if time.monotonic() > deadline:
+        raise TimeoutError("Processing timed out")
+
+
+def _release_job_slot(job: asyncio.Future) -> None:
+    """Done-callback for a processing job: free its _PROCESS_SEM slot"""
+    _PROCESS_SEM.release()
+    # A job that outlived its timeout is never awaited; retrieve its
+    # exception so asyncio doesn't log it as unhandled
+    if not job.cancelled():
+        job.exception()
+
+
+def _process_one_seq(zip_ref: zipfile.ZipFile, budget: ExtractionBudget, seq_info: zipfile.ZipInfo,
+                     offset: int, cut_type: str, deadline: float) -> tuple:
+    """
+    Apply cuts to a single timeline, parsed straight from the archive.
+    Returns (is_timeline, boundary_count, applied_count, new_xml), where
+    new_xml is the serialized timeline if anything changed, else None
+    """
+    _check_deadline(deadline)
+    try:
+        with open_member(zip_ref, seq_info, budget) as f:
+            tree = parse_timeline_xml(f)
+    except ET.ParseError:
+        return False, 0, 0, None
+    
+    if tree.getroot().tag != "Sm2SequenceContainer":
+        return False, 0, 0, None
+    
+    info = get_timeline_info_from_tree(tree, seq_info.filename)
+    clip_pairs = find_clip_pairs(info['video_clips'], info['audio_clips'])
+    boundaries = find_eligible_boundaries(clip_pairs)
+    
+    if not boundaries:
+        return True, 0, 0, None
+    
+    results = apply_cuts_to_timeline(boundaries, offset, cut_type, dry_run=False, return_messages=False)
+    if results['success_count'] == 0:
+        return True, len(boundaries), 0, None
+    
+    return True, len(boundaries), results['success_count'], tree_to_bytes(tree)
+
+
+def _process_drp_sync(upload: BinaryIO, cut_type: str, offset: int, original_filename: str,
+                      deadline: float) -> tuple:
+    """
+    Transform a DRP file, reading and rewriting it without extracting it to
+    disk: timelines are parsed straight from the archive and the output is
+    the input with the modified timelines swapped in.
+    Blocking and CPU-bound, so it must run off the event loop.
+    The output is written to its own temporary directory, which the caller
+    must remove once the file has been sent.
+    The caller stops waiting at the deadline but cannot stop this thread, so
+    the deadline is also checked between stages and raises TimeoutError.
+    Returns (output_path, total_applied, total_boundaries)
+    """
+    with zipfile.ZipFile(upload) as zip_ref:
+        seq_infos = [info for info in zip_ref.infolist() if is_sequence_member(info.filename)]
+        
+        # Timelines are independent, so process them in parallel; the budget
+        # enforces the decompressed size limit across all of them
+        budget = ExtractionBudget(MAX_EXTRACTED_SIZE)
+        process_seq = partial(_process_one_seq, zip_ref, budget, offset=offset, cut_type=cut_type, deadline=deadline)
+        try:
+            if seq_infos:
+                with ThreadPoolExecutor(max_workers=min(MAX_TIMELINE_WORKERS, len(seq_infos))) as executor:
+                    results = list(executor.map(process_seq, seq_infos))
+            else:
+                results = []
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        if not any(is_timeline for is_timeline, _, _, _ in results):
+            raise HTTPException(
+                status_code=400,
+                detail="No timelines found in project file"
+            )
+        
+        total_boundaries = sum(boundary_count for _, boundary_count, _, _ in results)
+        total_applied = sum(applied_count for _, _, applied_count, _ in results)
+        
+        # Check if any cuts were applied
+        if total_boundaries == 0:
+            raise HTTPException(
+                status_code=400,
+                detail="No eligible boundaries found in project. Clips must have aligned audio/video."
+            )
+        
+        if total_applied == 0:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Could not apply {cut_type}-cuts. Try a smaller offset or different cut type."
+            )
+        
+        replacements = {
+            info.filename: new_xml
+            for info, (_, _, _, new_xml) in zip(seq_infos, results)
+            if new_xml is not None
+        }
+        
+        # Write the new DRP to a per-request output directory
+        _check_deadline(deadline)
+        output_name = get_output_name(original_filename, cut_type)
+        output_dir = tempfile.mkdtemp(prefix="drp_output_")
+        try:
+            try:
+                output_path = rewrite_drp(
+                    zip_ref, os.path.join(output_dir, output_name), replacements,
+                    max_extracted_size=MAX_EXTRACTED_SIZE
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            # Nobody will collect (or clean up) the output if the caller gave up
+            _check_deadline(deadline)
+        except Exception:
+            cleanup_temp(output_dir)
+            raise
+        
+        return output_path, total_applied, total_boundaries
+
+
 @app.get("/")
 async def root():
     """Root endpoint with API information"""
@@ -130,10 +274,6 @@ async def process_drp(
     Returns the processed .drp file ready for download.
     """
     
-    temp_input = None
-    temp_dir = None
-    output_path = None
-    
     try:
         # Validate cut type
         cut_type = cut_type.upper()
@@ -153,77 +293,48 @@ async def process_drp(
                 detail=f"Invalid file type. Only {', '.join(ALLOWED_EXTENSIONS)} files are allowed"
             )
         
-        # Read file content
-        file_content = await file.read()
-        
-        # Validate file size
-        if len(file_content) > MAX_FILE_SIZE:
+        # The form parser has already spooled the upload (in memory, or on
+        # disk once it is large), so work on that file directly instead of
+        # copying it into another temporary file
+        file_size = file.size if file.size is not None else file.file.seek(0, os.SEEK_END)
+        if file_size > MAX_FILE_SIZE:
             raise HTTPException(
                 status_code=413,
-                detail=f"File size ({len(file_content)} bytes) exceeds maximum ({MAX_FILE_SIZE} bytes)"
+                detail=f"File size exceeds maximum ({MAX_FILE_SIZE} bytes)"
             )
+        await file.seek(0)
         
         # Validate ZIP structure
-        is_valid, error_msg = validate_zip_structure(file_content)
+        is_valid, error_msg = validate_zip_structure(file.file)
         if not is_valid:
             raise HTTPException(status_code=400, detail=error_msg)
         
-        # Save to temporary file
-        temp_input = tempfile.NamedTemporaryFile(delete=False, suffix='.drp')
-        temp_input.write(file_content)
-        temp_input.close()
-        
         # Process the file
-        print(f"Processing {file.filename} with {cut_type}-cuts, offset={offset}")
-        
-        # Extract DRP
-        temp_dir = unpack_drp(temp_input.name)
-        
-        # Find and process timelines
-        seq_files = find_sequence_files(temp_dir)
-        if not seq_files:
-            raise HTTPException(
-                status_code=400,
-                detail="No timelines found in project file"
-            )
-        
-        total_boundaries = 0
-        total_applied = 0
+        logger.info("Processing %s with %s-cuts, offset=%d", file.filename, cut_type, offset)
         
-        for seq_file in seq_files:
-            info = get_timeline_info(seq_file)
-            clip_pairs = find_clip_pairs(info['video_clips'], info['audio_clips'])
-            boundaries = find_eligible_boundaries(clip_pairs)
-            
-            total_boundaries += len(boundaries)
-            
-            if boundaries:
-                results = apply_cuts_to_timeline(boundaries, offset, cut_type, dry_run=False)
-                total_applied += results['success_count']
-                
-                if results['success_count'] > 0:
-                    save_timeline_xml(info['tree'], seq_file)
-        
-        # Check if any cuts were applied
-        if total_boundaries == 0:
-            raise HTTPException(
-                status_code=400,
-                detail="No eligible boundaries found in project. Clips must have aligned audio/video."
-            )
-        
-        if total_applied == 0:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Could not apply {cut_type}-cuts. Try a smaller offset or different cut type."
+        # Run the blocking pipeline (parse timelines from the archive, apply
+        # cuts, rewrite_drp the result) in the threadpool.
+        # The worker thread can't be interrupted, so the job gives its slot
+        # back only when the thread finishes; a job we stopped waiting for
+        # still counts against MAX_CONCURRENT_JOBS until then
+        await _PROCESS_SEM.acquire()
+        deadline = time.monotonic() + PROCESSING_TIMEOUT
+        job = asyncio.ensure_future(anyio.to_thread.run_sync(
+            _process_drp_sync, file.file, cut_type, offset, file.filename, deadline
+        ))
+        job.add_done_callback(_release_job_slot)
+        try:
+            output_path, total_applied, total_boundaries = await asyncio.wait_for(
+                asyncio.shield(job),
+                timeout=PROCESSING_TIMEOUT
             )
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Processing timed out")
+        output_name = Path(output_path).name
         
-        # Repack to new DRP
-        output_name = get_output_name(file.filename, cut_type)
-        output_path = repack_drp(temp_dir, output_name)
-        
-        print(f"Successfully applied {total_applied} {cut_type}-cuts to {file.filename}")
+        logger.info("Successfully applied %d %s-cuts to %s", total_applied, cut_type, file.filename)
         
-        # Return the processed file
+        # Return the processed file; its directory is removed once it has been sent
         return FileResponse(
             path=output_path,
             media_type='application/zip',
@@ -233,7 +344,8 @@ async def process_drp(
                 "X-Total-Boundaries": str(total_boundaries),
                 "X-Cut-Type": cut_type,
                 "X-Offset": str(offset)
-            }
+            },
+            background=BackgroundTask(cleanup_temp, os.path.dirname(output_path))
         )
         
     except HTTPException:
@@ -242,30 +354,17 @@ async def process_drp(
         
     except Exception as e:
         # Log the error and return 500
-        print(f"Error processing file: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error processing file: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Error processing file: {str(e)}"
         )
-        
-    finally:
-        # Cleanup temporary files
-        try:
-            if temp_input and os.path.exists(temp_input.name):
-                os.unlink(temp_input.name)
-            if temp_dir and os.path.exists(temp_dir):
-                cleanup_temp(temp_dir)
-            # Note: output_path cleanup is handled by FastAPI after sending response
-        except Exception as e:
-            print(f"Error cleaning up: {str(e)}")
 
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler for unhandled errors"""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"detail": f"Internal server error: {str(exc)}"}
     )
@@ -282,5 +381,6 @@ if __name__ == "__main__":
     print(f"Port: {port}")
     print("Visit /docs for interactive API documentation")
     
+    logging.basicConfig(level=logging.INFO)
     uvicorn.run(app, host="0.0.0.0", port=port)
 
@@ -5,14 +5,21 @@ Data structures and logic for detecting eligible cut boundaries in a timeline.
 
 from dataclasses import dataclass
 from typing import List, Optional
-import xml.etree.ElementTree as ET
-from resolve_parse import get_clip_property, parse_int_property
+from resolve_parse import ET, get_clip_elements, get_clip_properties, get_element_text, parse_int
 
+# Properties read from each clip while matching pairs
+PAIR_PROPERTIES = frozenset({"Name", "MediaRef", "Start", "Duration", "In"})
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class ClipPair:
     """
     Represents a matched video/audio clip pair.
+    
+    start/duration/in_point are the video clip's values; a_start/a_duration/a_in
+    are the audio clip's values as parsed when the pair was matched, and
+    a_start_el/a_dur_el/a_in_el are the audio clip's property elements (None if
+    missing) so cuts can update them without searching the clip again.
     """
     video_clip: ET.Element
     audio_clip: ET.Element
@@ -21,12 +28,18 @@ class ClipPair:
     duration: int
     in_point: int
     media_ref: str
+    a_start: int
+    a_duration: int
+    a_in: int
+    a_start_el: Optional[ET.Element]
+    a_dur_el: Optional[ET.Element]
+    a_in_el: Optional[ET.Element]
     
     def __repr__(self):
         return f"ClipPair(name={self.name}, start={self.start}, duration={self.duration}, in={self.in_point})"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Boundary:
     """
     Represents a cut boundary between two clip pairs.
@@ -52,28 +65,45 @@ def find_clip_pairs(video_clips: List[ET.Element], audio_clips: List[ET.Element]
     """
     pairs = []
     
+    # Names and media refs repeat across the video and audio tracks, so intern
+    # them to small ints and key the lookup on an all-int tuple
+    string_ids = {}
+    
     # Create a lookup for audio clips by (Name, MediaRef, Start)
     audio_lookup = {}
     for audio_clip in audio_clips:
-        name = get_clip_property(audio_clip, "Name") or ""
-        media_ref = get_clip_property(audio_clip, "MediaRef") or ""
-        start = parse_int_property(audio_clip, "Start")
+        elements = get_clip_elements(audio_clip, PAIR_PROPERTIES)
+        name = get_element_text(elements.get("Name")) or ""
+        media_ref = get_element_text(elements.get("MediaRef")) or ""
+        start = parse_int(get_element_text(elements.get("Start")))
         
-        key = (name, media_ref, start)
-        audio_lookup[key] = audio_clip
+        key = (string_ids.setdefault(name, len(string_ids)),
+               string_ids.setdefault(media_ref, len(string_ids)),
+               start)
+        audio_lookup[key] = (audio_clip, elements)
     
     # Match video clips with audio clips
     for video_clip in video_clips:
-        name = get_clip_property(video_clip, "Name") or ""
-        media_ref = get_clip_property(video_clip, "MediaRef") or ""
-        start = parse_int_property(video_clip, "Start")
-        duration = parse_int_property(video_clip, "Duration")
-        in_point = parse_int_property(video_clip, "In")
+        props = get_clip_properties(video_clip, PAIR_PROPERTIES)
+        name = props.get("Name") or ""
+        media_ref = props.get("MediaRef") or ""
+        
+        # A name or media ref never seen on the audio track can't match
+        name_id = string_ids.get(name)
+        media_ref_id = string_ids.get(media_ref)
+        if name_id is None or media_ref_id is None:
+            continue
         
-        key = (name, media_ref, start)
+        start = parse_int(props.get("Start"))
+        duration = parse_int(props.get("Duration"))
+        in_point = parse_int(props.get("In"))
+        
+        key = (name_id, media_ref_id, start)
         
         if key in audio_lookup:
-            audio_clip = audio_lookup[key]
+            audio_clip, audio_elements = audio_lookup[key]
+            a_dur_el = audio_elements.get("Duration")
+            a_in_el = audio_elements.get("In")
             
             pair = ClipPair(
                 video_clip=video_clip,
@@ -82,7 +112,13 @@ def find_clip_pairs(video_clips: List[ET.Element], audio_clips: List[ET.Element]
                 start=start,
                 duration=duration,
                 in_point=in_point,
-                media_ref=media_ref
+                media_ref=media_ref,
+                a_start=start,
+                a_duration=parse_int(get_element_text(a_dur_el)),
+                a_in=parse_int(get_element_text(a_in_el)),
+                a_start_el=audio_elements.get("Start"),
+                a_dur_el=a_dur_el,
+                a_in_el=a_in_el
             )
             pairs.append(pair)
     
@@ -102,21 +138,9 @@ def is_aligned(clip_pair: ClipPair) -> bool:
     Returns:
         True if video and audio have same Start, Duration, and In
     """
-    video = clip_pair.video_clip
-    audio = clip_pair.audio_clip
-    
-    v_start = parse_int_property(video, "Start")
-    a_start = parse_int_property(audio, "Start")
-    
-    v_duration = parse_int_property(video, "Duration")
-    a_duration = parse_int_property(audio, "Duration")
-    
-    v_in = parse_int_property(video, "In")
-    a_in = parse_int_property(audio, "In")
-    
-    return (v_start == a_start and 
-            v_duration == a_duration and 
-            v_in == a_in)
+    return (clip_pair.start == clip_pair.a_start and
+            clip_pair.duration == clip_pair.a_duration and
+            clip_pair.in_point == clip_pair.a_in)
 
 
 def find_eligible_boundaries(clip_pairs: List[ClipPair], max_gap: int = 10) -> List[Boundary]:
@@ -134,34 +158,28 @@ def find_eligible_boundaries(clip_pairs: List[ClipPair], max_gap: int = 10) -> L
     Returns:
         List of Boundary objects
     """
-    boundaries = []
+    # Derive per-pair arrays once; the ClipPair objects stay authoritative
+    aligned = [is_aligned(pair) for pair in clip_pairs]
+    starts = [pair.start for pair in clip_pairs]
+    ends = [start + pair.duration for start, pair in zip(starts, clip_pairs)]
     
-    for i in range(len(clip_pairs) - 1):
-        current_pair = clip_pairs[i]
-        next_pair = clip_pairs[i + 1]
-        
-        # Check if both pairs are aligned
-        if not is_aligned(current_pair):
-            continue
-        if not is_aligned(next_pair):
-            continue
-        
-        # Calculate cut frame (where current clip ends)
-        cut_frame = current_pair.start + current_pair.duration
-        
-        # Calculate gap between clips
-        gap = next_pair.start - cut_frame
-        
-        # Check if clips are consecutive or have acceptable gap
-        if 0 <= gap <= max_gap:
-            boundary = Boundary(
-                clip_pair_before=current_pair,
-                clip_pair_after=next_pair,
-                cut_frame=cut_frame
-            )
-            boundaries.append(boundary)
+    # Indices i where pairs i and i+1 are both aligned and consecutive or
+    # separated by an acceptable gap (the cut frame is where pair i ends)
+    eligible = [
+        i
+        for i, (aligned_before, aligned_after, end, next_start)
+        in enumerate(zip(aligned, aligned[1:], ends, starts[1:]))
+        if aligned_before and aligned_after and 0 <= next_start - end <= max_gap
+    ]
     
-    return boundaries
+    return [
+        Boundary(
+            clip_pair_before=clip_pairs[i],
+            clip_pair_after=clip_pairs[i + 1],
+            cut_frame=ends[i]
+        )
+        for i in eligible
+    ]
 
 
 def get_boundary_info(boundary: Boundary) -> dict:
@@ -216,8 +234,7 @@ def validate_boundary_for_offset(boundary: Boundary, offset: int) -> tuple[bool,
         return False, f"Offset would push next clip start below 0"
     
     # Check if offset would push in point negative (for J-cut)
-    after_in = parse_int_property(boundary.clip_pair_after.audio_clip, "In")
-    after_new_in = after_in - offset
+    after_new_in = boundary.clip_pair_after.a_in - offset
     if after_new_in < 0:
         return False, f"Offset would push next clip in point below 0"
     
@@ -227,10 +244,14 @@ def validate_boundary_for_offset(boundary: Boundary, offset: int) -> tuple[bool,
 # Module self-test
 if __name__ == "__main__":
     import sys
+    import logging
     from pathlib import Path
     from drp_io import unpack_drp, cleanup_temp
     from resolve_parse import find_sequence_files, get_timeline_info, get_track_items
     
+    # Show the modules' progress messages
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     if len(sys.argv) < 2:
         print("Usage: python cuts_model.py <path_to_drp_file>")
         print("This will test cut detection logic")
@@ -244,8 +265,8 @@ if __name__ == "__main__":
     try:
         # Extract and parse DRP
         print("1. Extracting and parsing DRP...")
-        temp_dir = unpack_drp(drp_file)
-        seq_files = find_sequence_files(temp_dir)
+        temp_dir, members = unpack_drp(drp_file)
+        seq_files = find_sequence_files(temp_dir, members)
         
         for seq_file in seq_files:
             print(f"\n   Processing: {Path(seq_file).name}")
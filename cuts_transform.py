@@ -3,12 +3,13 @@ Cuts Transform Module
 Logic for applying J-cuts and L-cuts to timeline boundaries.
 """
 
-from typing import Tuple
+from typing import Optional, Tuple
 from cuts_model import Boundary, ClipPair
-from resolve_parse import set_clip_property, parse_int_property
+from resolve_parse import get_element_text, parse_int, set_element_text
 
 
-def apply_j_cut(boundary: Boundary, offset: int, dry_run: bool = False) -> Tuple[bool, str]:
+def apply_j_cut(boundary: Boundary, offset: int, dry_run: bool = False,
+                with_message: bool = True) -> Tuple[bool, Optional[str]]:
     """
     Apply a J-cut at a boundary.
     
@@ -21,19 +22,21 @@ def apply_j_cut(boundary: Boundary, offset: int, dry_run: bool = False) -> Tuple
         boundary: Boundary where to apply the J-cut
         offset: Number of frames to offset (positive integer)
         dry_run: If True, don't actually modify, just validate
+        with_message: If False, skip formatting the result message
         
     Returns:
-        Tuple of (success, message)
+        Tuple of (success, message); message may be None when with_message
+        is False
     """
     if offset <= 0:
         return False, "Offset must be positive"
     
-    audio_clip = boundary.clip_pair_after.audio_clip
+    pair = boundary.clip_pair_after
     
     # Get current values
-    current_start = parse_int_property(audio_clip, "Start")
-    current_duration = parse_int_property(audio_clip, "Duration")
-    current_in = parse_int_property(audio_clip, "In")
+    current_start = parse_int(get_element_text(pair.a_start_el))
+    current_duration = parse_int(get_element_text(pair.a_dur_el))
+    current_in = parse_int(get_element_text(pair.a_in_el))
     
     # Calculate new values
     new_start = current_start - offset
@@ -42,27 +45,31 @@ def apply_j_cut(boundary: Boundary, offset: int, dry_run: bool = False) -> Tuple
     
     # Validate
     if new_start < 0:
-        return False, f"J-cut would push Start below 0 (new Start={new_start})"
+        return False, (f"J-cut would push Start below 0 (new Start={new_start})" if with_message else None)
     
     if new_in < 0:
-        return False, f"J-cut would push In below 0 (new In={new_in}). Clip may not have enough source media before the cut point."
+        return False, (f"J-cut would push In below 0 (new In={new_in}). Clip may not have enough source media before the cut point." if with_message else None)
     
     if current_duration < offset:
-        return False, f"Clip too short for offset {offset} (duration={current_duration})"
+        return False, (f"Clip too short for offset {offset} (duration={current_duration})" if with_message else None)
     
     # Apply changes if not dry run
     if not dry_run:
-        set_clip_property(audio_clip, "Start", str(new_start))
-        set_clip_property(audio_clip, "Duration", str(new_duration))
-        set_clip_property(audio_clip, "In", str(new_in))
+        set_element_text(pair.a_start_el, str(new_start))
+        set_element_text(pair.a_dur_el, str(new_duration))
+        set_element_text(pair.a_in_el, str(new_in))
     
-    clip_name = boundary.clip_pair_after.name
+    if not with_message:
+        return True, None
+    
+    clip_name = pair.name
     message = f"J-cut applied to '{clip_name}': Start {current_start}→{new_start}, Duration {current_duration}→{new_duration}, In {current_in}→{new_in}"
     
     return True, message
 
 
-def apply_l_cut(boundary: Boundary, offset: int, dry_run: bool = False) -> Tuple[bool, str]:
+def apply_l_cut(boundary: Boundary, offset: int, dry_run: bool = False,
+                with_message: bool = True) -> Tuple[bool, Optional[str]]:
     """
     Apply an L-cut at a boundary.
     
@@ -75,18 +82,19 @@ def apply_l_cut(boundary: Boundary, offset: int, dry_run: bool = False) -> Tuple
         boundary: Boundary where to apply the L-cut
         offset: Number of frames to offset (positive integer)
         dry_run: If True, don't actually modify, just validate
+        with_message: If False, skip formatting the result message
         
     Returns:
-        Tuple of (success, message)
+        Tuple of (success, message); message may be None when with_message
+        is False
     """
     if offset <= 0:
         return False, "Offset must be positive"
     
-    audio_clip = boundary.clip_pair_before.audio_clip
+    pair = boundary.clip_pair_before
     
     # Get current values
-    current_duration = parse_int_property(audio_clip, "Duration")
-    current_in = parse_int_property(audio_clip, "In")
+    current_duration = parse_int(get_element_text(pair.a_dur_el))
     
     # Calculate new values
     new_duration = current_duration + offset
@@ -96,13 +104,16 @@ def apply_l_cut(boundary: Boundary, offset: int, dry_run: bool = False) -> Tuple
     # However, we don't have source media info in the XML, so we do basic checks
     
     if current_duration < 1:
-        return False, f"Clip too short (duration={current_duration})"
+        return False, (f"Clip too short (duration={current_duration})" if with_message else None)
     
     # Apply changes if not dry run
     if not dry_run:
-        set_clip_property(audio_clip, "Duration", str(new_duration))
+        set_element_text(pair.a_dur_el, str(new_duration))
+    
+    if not with_message:
+        return True, None
     
-    clip_name = boundary.clip_pair_before.name
+    clip_name = pair.name
     message = f"L-cut applied to '{clip_name}': Duration {current_duration}→{new_duration}"
     
     return True, message
@@ -136,7 +147,15 @@ def validate_l_cut(boundary: Boundary, offset: int) -> Tuple[bool, str]:
     return apply_l_cut(boundary, offset, dry_run=True)
 
 
-def apply_cuts_to_timeline(boundaries: list, offset: int, cut_type: str, dry_run: bool = False) -> dict:
+# Cut functions by cut type
+_CUT_FNS = {
+    'J': apply_j_cut,
+    'L': apply_l_cut,
+}
+
+
+def apply_cuts_to_timeline(boundaries: list, offset: int, cut_type: str, dry_run: bool = False,
+                           return_messages: bool = True) -> dict:
     """
     Apply J-cuts or L-cuts to all boundaries in a timeline.
     
@@ -145,6 +164,8 @@ def apply_cuts_to_timeline(boundaries: list, offset: int, cut_type: str, dry_run
         offset: Offset in frames
         cut_type: Either "J" or "L"
         dry_run: If True, validate but don't modify
+        return_messages: If False, leave 'messages' empty and skip formatting
+            the per-boundary messages
         
     Returns:
         Dictionary with results: {
@@ -153,6 +174,9 @@ def apply_cuts_to_timeline(boundaries: list, offset: int, cut_type: str, dry_run
             'messages': list of str,
             'successful_boundaries': list of Boundary
         }
+        
+    Raises:
+        ValueError: If cut_type is not "J" or "L"
     """
     results = {
         'success_count': 0,
@@ -161,19 +185,22 @@ def apply_cuts_to_timeline(boundaries: list, offset: int, cut_type: str, dry_run
         'successful_boundaries': []
     }
     
-    cut_function = apply_j_cut if cut_type.upper() == 'J' else apply_l_cut
+    cut_function = _CUT_FNS.get(cut_type.upper())
+    if cut_function is None:
+        raise ValueError(f"Unknown cut type: {cut_type!r} (expected 'J' or 'L')")
     
     for i, boundary in enumerate(boundaries):
-        boundary_num = i + 1
-        success, message = cut_function(boundary, offset, dry_run)
+        success, message = cut_function(boundary, offset, dry_run, return_messages)
         
         if success:
             results['success_count'] += 1
             results['successful_boundaries'].append(boundary)
-            results['messages'].append(f"  ✓ Boundary {boundary_num}: {message}")
+            if return_messages:
+                results['messages'].append(f"  ✓ Boundary {i + 1}: {message}")
         else:
             results['fail_count'] += 1
-            results['messages'].append(f"  ✗ Boundary {boundary_num}: {message}")
+            if return_messages:
+                results['messages'].append(f"  ✗ Boundary {i + 1}: {message}")
     
     return results
 
@@ -181,11 +208,15 @@ def apply_cuts_to_timeline(boundaries: list, offset: int, cut_type: str, dry_run
 # Module self-test
 if __name__ == "__main__":
     import sys
+    import logging
     from pathlib import Path
     from drp_io import unpack_drp, cleanup_temp
     from resolve_parse import find_sequence_files, get_timeline_info, save_timeline_xml
     from cuts_model import find_clip_pairs, find_eligible_boundaries
     
+    # Show the modules' progress messages
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     if len(sys.argv) < 2:
         print("Usage: python cuts_transform.py <path_to_drp_file>")
         print("This will test cut transformation logic (dry-run mode)")
@@ -199,8 +230,8 @@ if __name__ == "__main__":
     try:
         # Extract and parse DRP
         print("1. Extracting and parsing DRP...")
-        temp_dir = unpack_drp(drp_file)
-        seq_files = find_sequence_files(temp_dir)
+        temp_dir, members = unpack_drp(drp_file)
+        seq_files = find_sequence_files(temp_dir, members)
         
         print(f"   Found {len(seq_files)} timeline(s)")
         
@@ -8,27 +8,48 @@ import zipfile
 import tempfile
 import shutil
 import os
+import logging
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Dict, List, Optional, Tuple
 
+logger = logging.getLogger(__name__)
 
-def unpack_drp(drp_path: str) -> str:
+# Extraction limits
+EXTRACT_CHUNK_SIZE = 64 * 1024  # 64KB
+WHOLE_ENTRY_MAX_SIZE = 4 * 1024 * 1024  # entries up to 4MB are inflated in one read
+MAX_COMPRESSION_RATIO = 100  # decompressed bytes per compressed byte
+RATIO_CHECK_MIN_SIZE = 1024 * 1024  # small entries are exempt from the ratio check
+EXTRACT_WORKERS = 8  # max threads inflating members in parallel
+
+# Repack settings
+DEFLATE_EXTENSIONS = ('.xml', '.txt', '.json')  # text members worth compressing; others are stored
+DEFLATE_LEVEL = 1  # fastest zlib level; project XML compresses nearly as well as at the default 6
+REPACK_COPY_SIZE = 1024 * 1024  # 1MB read/write buffer when adding files
+ZIP64_EXTRA_ID = 0x0001  # extra field header ID of the ZIP64 sizes record
+
+
+def unpack_drp(drp_path: str, max_extracted_size: Optional[int] = None) -> Tuple[str, List[str]]:
     """
     Unpack a .drp file to a temporary directory.
     
     Args:
         drp_path: Path to the .drp file
+        max_extracted_size: Optional cap on the total decompressed size in bytes
         
     Returns:
-        Path to the temporary directory containing extracted files
+        Tuple of (path to the temporary directory containing extracted files,
+        archive names of the extracted files)
         
     Raises:
         FileNotFoundError: If the .drp file doesn't exist
         zipfile.BadZipFile: If the file is not a valid ZIP archive
+        ValueError: If the archive is malformed or exceeds the extraction limits
     """
-    drp_path = Path(drp_path)
-    
-    if not drp_path.exists():
+    if not os.path.exists(drp_path):
         raise FileNotFoundError(f"DRP file not found: {drp_path}")
     
     # Create a temporary directory
@@ -37,15 +58,16 @@ def unpack_drp(drp_path: str) -> str:
     try:
         # Extract the .drp (which is a ZIP file)
         with zipfile.ZipFile(drp_path, 'r') as zip_ref:
-            zip_ref.extractall(temp_dir)
-        
-        print(f"✓ Extracted {drp_path.name} to temporary directory")
+            # Verify the structure from the archive listing, before paying
+            # for the extraction
+            if not verify_drp_namelist(zip_ref.namelist()):
+                raise ValueError("Invalid DRP structure: missing required files")
+            
+            members = extract_members(zip_ref, temp_dir, max_extracted_size)
         
-        # Verify the structure
-        if not verify_drp_structure(temp_dir):
-            raise ValueError("Invalid DRP structure: missing required files")
+        logger.info("Extracted %s to temporary directory", os.path.basename(drp_path))
         
-        return temp_dir
+        return temp_dir, members
         
     except Exception as e:
         # Clean up on error
@@ -53,6 +75,151 @@ def unpack_drp(drp_path: str) -> str:
         raise e
 
 
+class ExtractionBudget:
+    """
+    Running total of decompressed bytes, shared by the threads reading
+    members of one archive.
+    """
+    
+    def __init__(self, limit: Optional[int]):
+        self.limit = limit
+        self.used = 0
+        self._lock = threading.Lock()
+    
+    def charge(self, size: int) -> None:
+        """Add size bytes to the total, raising ValueError once it exceeds the limit"""
+        if self.limit is None:
+            return
+        
+        with self._lock:
+            self.used += size
+            if self.used > self.limit:
+                raise ValueError(f"Extracted size exceeds maximum ({self.limit} bytes)")
+
+
+def extract_members(zip_ref: zipfile.ZipFile, dest_dir: str, max_extracted_size: Optional[int] = None) -> List[str]:
+    """
+    Extract all members of an open archive, inflating them in parallel.
+    
+    Limits are enforced on the bytes actually decompressed rather than the
+    sizes advertised in the archive headers, so a crafted archive cannot
+    expand past them.
+    
+    Args:
+        zip_ref: Open ZipFile to extract from
+        dest_dir: Directory to extract into
+        max_extracted_size: Optional cap on the total decompressed size in bytes
+        
+    Returns:
+        Archive names of the extracted files (directories excluded)
+        
+    Raises:
+        ValueError: If a member path escapes dest_dir, the total size exceeds
+            max_extracted_size, or a member exceeds MAX_COMPRESSION_RATIO
+    """
+    dest_root = Path(dest_dir).resolve()
+    infos = []
+    dests = []
+    
+    # Validate paths and create directories up front, in this thread
+    for info in zip_ref.infolist():
+        dest = (dest_root / info.filename).resolve()
+        if dest_root not in dest.parents:
+            raise ValueError(f"Invalid file path in archive: {info.filename}")
+        
+        if info.is_dir():
+            dest.mkdir(parents=True, exist_ok=True)
+            continue
+        
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        infos.append(info)
+        dests.append(dest)
+    
+    # Members are independent DEFLATE streams and zlib releases the GIL while
+    # inflating, so threads genuinely extract them in parallel
+    extract = partial(_extract_member, zip_ref, ExtractionBudget(max_extracted_size))
+    workers = min(EXTRACT_WORKERS, os.cpu_count() or 1, len(infos))
+    
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(extract, infos, dests))
+    else:
+        for info, dest in zip(infos, dests):
+            extract(info, dest)
+    
+    return [info.filename for info in infos]
+
+
+class _LimitedMemberReader:
+    """
+    Read-only file object over an archive member that charges every
+    decompressed byte to a budget and enforces MAX_COMPRESSION_RATIO.
+    """
+    
+    def __init__(self, src: BinaryIO, info: zipfile.ZipInfo, budget: ExtractionBudget):
+        self._src = src
+        self._info = info
+        self._budget = budget
+        self._max_size = MAX_COMPRESSION_RATIO * max(info.compress_size, 1)
+        self._read = 0
+    
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._src.read(size)
+        self._read += len(chunk)
+        self._budget.charge(len(chunk))
+        
+        if self._read > RATIO_CHECK_MIN_SIZE and self._read > self._max_size:
+            raise ValueError(f"Compression ratio of {self._info.filename} exceeds maximum ({MAX_COMPRESSION_RATIO}:1)")
+        
+        return chunk
+    
+    def close(self) -> None:
+        self._src.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_member(zip_ref: zipfile.ZipFile, info: zipfile.ZipInfo, budget: ExtractionBudget) -> _LimitedMemberReader:
+    """
+    Open an archive member for reading with the extraction limits applied.
+    
+    Args:
+        zip_ref: Open ZipFile containing the member
+        info: Member to open
+        budget: Decompressed size budget to charge
+        
+    Returns:
+        Binary file object; read() raises ValueError once the budget is
+        exhausted or the member exceeds MAX_COMPRESSION_RATIO
+    """
+    return _LimitedMemberReader(zip_ref.open(info), info, budget)
+
+
+def _extract_member(zip_ref: zipfile.ZipFile, budget: ExtractionBudget, info: zipfile.ZipInfo, dest: Path) -> None:
+    """
+    Extract a single archive member to dest, charging its size to budget.
+    
+    Raises:
+        ValueError: If the budget is exhausted or the member exceeds MAX_COMPRESSION_RATIO
+    """
+    # Small entries (most of a DRP's XML) are inflated as a whole buffer;
+    # ZipExtFile never returns more than the header's file_size, and the
+    # reader's limits still apply to what is actually read. Larger entries
+    # are streamed so memory stays bounded.
+    if info.file_size <= WHOLE_ENTRY_MAX_SIZE:
+        read_size = info.file_size
+    else:
+        read_size = EXTRACT_CHUNK_SIZE
+    
+    with open_member(zip_ref, info, budget) as src, open(dest, 'wb') as dst:
+        while chunk := src.read(read_size):
+            dst.write(chunk)
+
+
 def repack_drp(temp_dir: str, output_name: str, output_dir: Optional[str] = None) -> str:
     """
     Repack a temporary directory back into a .drp file.
@@ -68,9 +235,7 @@ def repack_drp(temp_dir: str, output_name: str, output_dir: Optional[str] = None
     Raises:
         FileNotFoundError: If temp_dir doesn't exist
     """
-    temp_dir = Path(temp_dir)
-    
-    if not temp_dir.exists():
+    if not os.path.exists(temp_dir):
         raise FileNotFoundError(f"Temporary directory not found: {temp_dir}")
     
     # Ensure output name has .drp extension
@@ -79,40 +244,142 @@ def repack_drp(temp_dir: str, output_name: str, output_dir: Optional[str] = None
     
     # Determine output directory
     if output_dir is None:
-        output_dir = Path.cwd()
-    else:
-        output_dir = Path(output_dir)
+        output_dir = os.getcwd()
     
     # Create output path
-    output_path = output_dir / output_name
-    
-    # Create a temporary ZIP file first
-    temp_zip = temp_dir.parent / f"{output_name}.tmp"
+    output_path = os.path.join(output_dir, output_name)
     
     try:
-        # Create ZIP file with all contents
-        with zipfile.ZipFile(temp_zip, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+        # Create ZIP file with all contents, straight at the output path
+        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
             # Walk through all files in temp_dir
-            for root, dirs, files in os.walk(temp_dir):
-                for file in files:
-                    file_path = Path(root) / file
-                    # Calculate the archive name (relative path from temp_dir)
-                    arcname = file_path.relative_to(temp_dir)
-                    zip_ref.write(file_path, arcname)
+            for file_path, arcname in _scan_files(temp_dir):
+                # Same as zip_ref.write(), but with a larger copy buffer than
+                # its fixed 8KB
+                zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+                _set_compression(zinfo)
+                with open(file_path, 'rb') as src, zip_ref.open(zinfo, 'w') as dst:
+                    shutil.copyfileobj(src, dst, REPACK_COPY_SIZE)
         
-        # Rename to .drp
-        shutil.move(str(temp_zip), str(output_path))
+        logger.info("Created %s", output_name)
+        return output_path
         
-        print(f"✓ Created {output_path.name}")
-        return str(output_path)
+    except Exception as e:
+        # Don't leave a partial archive behind
+        if os.path.exists(output_path):
+            os.unlink(output_path)
+        raise e
+
+
+def rewrite_drp(zip_ref: zipfile.ZipFile, output_path: str, replacements: Dict[str, bytes],
+                max_extracted_size: Optional[int] = None) -> str:
+    """
+    Write a copy of an open .drp archive with some members replaced,
+    without extracting it to disk.
+    
+    Untouched members are streamed from the source archive through the
+    same limits as unpack_drp; member order and timestamps are preserved.
+    
+    Args:
+        zip_ref: Open source archive
+        output_path: Path of the .drp file to create
+        replacements: New contents keyed by archive name
+        max_extracted_size: Optional cap on the total bytes copied from the
+            source archive
+        
+    Returns:
+        Path to the created .drp file
+        
+    Raises:
+        ValueError: If the source exceeds the extraction limits
+    """
+    budget = ExtractionBudget(max_extracted_size)
+    
+    try:
+        with zipfile.ZipFile(output_path, 'w') as out_zip:
+            for info in zip_ref.infolist():
+                # Keep the source's metadata; external_attr is only meaningful
+                # together with the create_system it was written for (DOS
+                # attributes read as Unix modes would extract as mode 0)
+                out_info = zipfile.ZipInfo(info.filename, info.date_time)
+                out_info.create_system = info.create_system
+                out_info.external_attr = info.external_attr
+                out_info.comment = info.comment
+                out_info.extra = _strip_zip64_extra(info.extra)
+                
+                if info.is_dir():
+                    out_zip.writestr(out_info, b"")
+                    continue
+                
+                _set_compression(out_info)
+                
+                if info.filename in replacements:
+                    out_zip.writestr(out_info, replacements[info.filename])
+                    continue
+                
+                with open_member(zip_ref, info, budget) as src, out_zip.open(out_info, 'w') as dst:
+                    shutil.copyfileobj(src, dst, REPACK_COPY_SIZE)
+        
+        logger.info("Created %s", os.path.basename(output_path))
+        return output_path
         
     except Exception as e:
-        # Clean up temporary zip on error
-        if temp_zip.exists():
-            temp_zip.unlink()
+        # Don't leave a partial archive behind
+        if os.path.exists(output_path):
+            os.unlink(output_path)
         raise e
 
 
+def _strip_zip64_extra(extra: bytes) -> bytes:
+    """
+    Copy a member's extra field without its ZIP64 record. zipfile adds its
+    own when the rewritten member needs one; a copied record would repeat
+    it, or carry the source's sizes into an entry that doesn't use ZIP64.
+    """
+    kept = []
+    pos = 0
+    while pos + 4 <= len(extra):
+        header_id, size = struct.unpack_from('<HH', extra, pos)
+        end = pos + 4 + size
+        if header_id != ZIP64_EXTRA_ID:
+            kept.append(extra[pos:end])
+        pos = end
+    return b"".join(kept)
+
+
+def _set_compression(zinfo: zipfile.ZipInfo) -> None:
+    """
+    Pick the compression method for an archive member before it is written.
+    Binary payloads (thumbnails, caches) are already compressed, so
+    deflating them again costs CPU for no size gain.
+    """
+    if zinfo.filename.lower().endswith(DEFLATE_EXTENSIONS):
+        zinfo.compress_type = zipfile.ZIP_DEFLATED
+        # ZipFile.open() takes no compresslevel argument; this is the
+        # attribute ZipFile.write()/writestr() set for the same purpose
+        zinfo._compresslevel = DEFLATE_LEVEL
+    else:
+        zinfo.compress_type = zipfile.ZIP_STORED
+
+
+def _scan_files(root: str, prefix: str = ""):
+    """
+    Recursively yield (path, archive name) for every file under root.
+    
+    Uses os.scandir so file/directory checks come from the directory listing
+    instead of a stat() per entry, and builds archive names as strings rather
+    than through Path.relative_to.
+    """
+    with os.scandir(root) as it:
+        entries = list(it)
+    
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from _scan_files(entry.path, f"{prefix}{entry.name}/")
+        elif entry.is_file(follow_symlinks=False):
+            yield entry.path, prefix + entry.name
+
+
 def verify_drp_structure(temp_dir: str) -> bool:
     """
     Verify that the extracted directory has the required DRP structure.
@@ -123,22 +390,50 @@ def verify_drp_structure(temp_dir: str) -> bool:
     Returns:
         True if structure is valid, False otherwise
     """
-    temp_dir = Path(temp_dir)
-    
     # Required files/directories
     required_files = ['project.xml']
     required_dirs = ['SeqContainer']
     
     # Check for required files
     for file in required_files:
-        if not (temp_dir / file).exists():
-            print(f"✗ Missing required file: {file}")
+        if not os.path.exists(os.path.join(temp_dir, file)):
+            logger.warning("Missing required file: %s", file)
             return False
     
     # Check for required directories
     for dir_name in required_dirs:
-        if not (temp_dir / dir_name).is_dir():
-            print(f"✗ Missing required directory: {dir_name}")
+        if not os.path.isdir(os.path.join(temp_dir, dir_name)):
+            logger.warning("Missing required directory: %s", dir_name)
+            return False
+    
+    return True
+
+
+def verify_drp_namelist(names: List[str]) -> bool:
+    """
+    Verify that an archive listing has the required DRP structure.
+    Same checks as verify_drp_structure, without extracting anything.
+    
+    Args:
+        names: Archive member names (ZipFile.namelist())
+        
+    Returns:
+        True if structure is valid, False otherwise
+    """
+    # Required files/directories
+    required_files = ['project.xml']
+    required_dirs = ['SeqContainer/']
+    
+    # Check for required files
+    for file in required_files:
+        if file not in names:
+            logger.warning("Missing required file: %s", file)
+            return False
+    
+    # Check for required directories (explicit entry or any member inside)
+    for dir_name in required_dirs:
+        if not any(name.startswith(dir_name) for name in names):
+            logger.warning("Missing required directory: %s", dir_name.rstrip('/'))
             return False
     
     return True
@@ -151,11 +446,9 @@ def cleanup_temp(temp_dir: str) -> None:
     Args:
         temp_dir: Path to the temporary directory to remove
     """
-    temp_dir = Path(temp_dir)
-    
-    if temp_dir.exists() and temp_dir.is_dir():
+    if os.path.isdir(temp_dir):
         shutil.rmtree(temp_dir)
-        print(f"✓ Cleaned up temporary directory")
+        logger.info("Cleaned up temporary directory")
 
 
 def get_output_name(original_path: str, cut_type: str) -> str:
@@ -186,6 +479,9 @@ def get_output_name(original_path: str, cut_type: str) -> str:
 if __name__ == "__main__":
     import sys
     
+    # Show the module's progress messages
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     if len(sys.argv) < 2:
         print("Usage: python drp_io.py <path_to_drp_file>")
         print("This will test extraction and repacking of a .drp file")
@@ -199,8 +495,8 @@ if __name__ == "__main__":
     try:
         # Test unpacking
         print("1. Testing unpack_drp()...")
-        temp_dir = unpack_drp(drp_file)
-        print(f"   Extracted to: {temp_dir}")
+        temp_dir, members = unpack_drp(drp_file)
+        print(f"   Extracted {len(members)} files to: {temp_dir}")
         
         # List contents
         print("\n2. Contents:")
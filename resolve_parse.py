@@ -1,46 +1,145 @@
 """
 Resolve Parse Module
 Utilities for locating and parsing DaVinci Resolve XML files.
+Uses lxml when it is installed, otherwise the standard library ElementTree.
 """
 
-import xml.etree.ElementTree as ET
+try:
+    from lxml import etree as ET
+    HAVE_LXML = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+    HAVE_LXML = False
+import io
+import logging
+import os
 from pathlib import Path
-from typing import List, Optional
+from typing import BinaryIO, Dict, Iterable, List, Optional, Union
 
+logger = logging.getLogger(__name__)
 
-def find_sequence_files(temp_dir: str) -> List[str]:
+
+# Project files are untrusted input: never expand entities, load DTDs or
+# touch the network. (The stdlib parser resolves neither external entities
+# nor DTDs, and expat >= 2.4.1 caps entity expansion itself.)
+# huge_tree lifts libxml2's 10MB text node / nesting limits so large sequence
+# files still parse; archive size is already capped during extraction.
+# Blank text is kept so saved files differ from the input only where edited.
+_LXML_PARSER_OPTIONS = dict(
+    resolve_entities=False,
+    load_dtd=False,
+    no_network=True,
+    huge_tree=True,
+    remove_blank_text=False,
+)
+
+
+# Clips of a track, gathered by libxml2 in one call: the first video clip
+# of each item, or its first audio clip if it has no video clip (the same
+# selection as the ElementTree loop in get_track_items), in document order
+_TRACK_CLIPS_XPATH = ET.XPath(
+    "Items[1]/Element/Sm2TiVideoClip[1]"
+    " | Items[1]/Element[not(Sm2TiVideoClip)]/Sm2TiAudioClip[1]"
+) if HAVE_LXML else None
+
+
+# First track of each kind, compiled once: the same lookup as the chained
+# find() calls in get_video_track/get_audio_track
+_VIDEO_TRACK_XPATH = ET.XPath("VideoTrackVec[1]/Element[1]/Sm2TiTrack[1]") if HAVE_LXML else None
+_AUDIO_TRACK_XPATH = ET.XPath("AudioTrackVec[1]/Element[1]/Sm2TiTrack[1]") if HAVE_LXML else None
+
+
+def _make_parser():
+    """
+    Create a hardened XML parser, or None for the stdlib default parser.
+    lxml parsers must not be shared between threads, so make one per parse.
+    """
+    if HAVE_LXML:
+        return ET.XMLParser(**_LXML_PARSER_OPTIONS)
+    return None
+
+
+def _iterparse(source: Union[str, BinaryIO], events: tuple):
+    """Incrementally parse an XML file (path or binary file object) with the same hardening as _make_parser"""
+    if HAVE_LXML:
+        return ET.iterparse(source, events=events, **_LXML_PARSER_OPTIONS)
+    return ET.iterparse(source, events=events)
+
+
+def find_sequence_files(temp_dir: str, members: Optional[List[str]] = None) -> List[str]:
     """
     Find all Sm2SequenceContainer XML files in the extracted DRP directory.
     
     Args:
         temp_dir: Path to the extracted DRP directory
+        members: Optional archive names of the extracted files (as returned by
+            unpack_drp); when given, the directory is not listed again
         
     Returns:
         List of paths to sequence container XML files
     """
-    temp_dir = Path(temp_dir)
-    seq_dir = temp_dir / "SeqContainer"
-    
-    if not seq_dir.exists():
-        return []
+    seq_dir = os.path.join(temp_dir, "SeqContainer")
     
     # Find all XML files in SeqContainer directory
-    xml_files = list(seq_dir.glob("*.xml"))
+    if members is not None:
+        xml_files = [os.path.join(temp_dir, name) for name in members if is_sequence_member(name)]
+    elif os.path.isdir(seq_dir):
+        # DirEntry.is_file() answers from the directory listing itself, so
+        # this avoids a stat() per entry
+        with os.scandir(seq_dir) as it:
+            xml_files = [
+                entry.path for entry in it
+                if entry.is_file(follow_symlinks=False) and entry.name.endswith(".xml")
+            ]
+    else:
+        return []
     
     # Filter for files that contain Sm2SequenceContainer root element
     sequence_files = []
     for xml_file in xml_files:
         try:
-            tree = ET.parse(xml_file)
-            root = tree.getroot()
-            if root.tag == "Sm2SequenceContainer":
-                sequence_files.append(str(xml_file))
+            if get_root_tag(xml_file) == "Sm2SequenceContainer":
+                sequence_files.append(xml_file)
         except ET.ParseError:
             continue
     
     return sequence_files
 
 
+def is_sequence_member(name: str) -> bool:
+    """
+    Check whether an archive name is a candidate sequence file
+    (an XML file directly inside SeqContainer/).
+    
+    Args:
+        name: Archive member name
+        
+    Returns:
+        True if the member may hold an Sm2SequenceContainer
+    """
+    return name.startswith("SeqContainer/") and name.endswith(".xml") and name.count("/") == 1
+
+
+def get_root_tag(xml_path: str) -> str:
+    """
+    Get the tag of an XML file's root element without parsing the rest of it.
+    
+    Args:
+        xml_path: Path to the XML file
+        
+    Returns:
+        Root element tag
+        
+    Raises:
+        ET.ParseError: If the file does not start with a well-formed element
+    """
+    # Stop at the first start event; the file is opened here so it is closed
+    # as soon as we return rather than when the abandoned iterator is collected
+    with open(xml_path, 'rb') as f:
+        _, root = next(_iterparse(f, events=("start",)))
+        return root.tag
+
+
 def load_timeline_xml(xml_path: str) -> ET.ElementTree:
     """
     Load and parse a timeline XML file.
@@ -55,13 +154,27 @@ def load_timeline_xml(xml_path: str) -> ET.ElementTree:
         FileNotFoundError: If file doesn't exist
         ET.ParseError: If XML is malformed
     """
-    xml_path = Path(xml_path)
-    
-    if not xml_path.exists():
+    if not os.path.exists(xml_path):
         raise FileNotFoundError(f"XML file not found: {xml_path}")
     
-    tree = ET.parse(xml_path)
-    return tree
+    return parse_timeline_xml(xml_path)
+
+
+def parse_timeline_xml(source: Union[str, BinaryIO]) -> ET.ElementTree:
+    """
+    Parse a timeline XML document from a path or a binary file object,
+    e.g. an archive member opened with ZipFile.open.
+    
+    Args:
+        source: Path or readable binary file object
+        
+    Returns:
+        ElementTree object
+        
+    Raises:
+        ET.ParseError: If XML is malformed
+    """
+    return ET.parse(source, _make_parser())
 
 
 def save_timeline_xml(tree: ET.ElementTree, xml_path: str) -> None:
@@ -73,8 +186,6 @@ def save_timeline_xml(tree: ET.ElementTree, xml_path: str) -> None:
         tree: ElementTree object to save
         xml_path: Path where to save the file
     """
-    xml_path = Path(xml_path)
-    
     # Write with XML declaration and UTF-8 encoding
     tree.write(
         xml_path,
@@ -82,7 +193,22 @@ def save_timeline_xml(tree: ET.ElementTree, xml_path: str) -> None:
         xml_declaration=True
     )
     
-    print(f"✓ Saved {xml_path.name}")
+    logger.info("Saved %s", os.path.basename(xml_path))
+
+
+def tree_to_bytes(tree: ET.ElementTree) -> bytes:
+    """
+    Serialize a timeline XML tree exactly as save_timeline_xml would write it.
+    
+    Args:
+        tree: ElementTree object to serialize
+        
+    Returns:
+        UTF-8 encoded document with XML declaration
+    """
+    buffer = io.BytesIO()
+    tree.write(buffer, encoding='UTF-8', xml_declaration=True)
+    return buffer.getvalue()
 
 
 def get_video_track(root: ET.Element) -> Optional[ET.Element]:
@@ -95,6 +221,10 @@ def get_video_track(root: ET.Element) -> Optional[ET.Element]:
     Returns:
         First Sm2TiTrack element from VideoTrackVec, or None
     """
+    if HAVE_LXML:
+        tracks = _VIDEO_TRACK_XPATH(root)
+        return tracks[0] if tracks else None
+    
     video_track_vec = root.find("VideoTrackVec")
     if video_track_vec is None:
         return None
@@ -119,6 +249,10 @@ def get_audio_track(root: ET.Element) -> Optional[ET.Element]:
     Returns:
         First Sm2TiTrack element from AudioTrackVec, or None
     """
+    if HAVE_LXML:
+        tracks = _AUDIO_TRACK_XPATH(root)
+        return tracks[0] if tracks else None
+    
     audio_track_vec = root.find("AudioTrackVec")
     if audio_track_vec is None:
         return None
@@ -143,21 +277,29 @@ def get_track_items(track: ET.Element) -> List[ET.Element]:
     Returns:
         List of clip elements (Sm2TiVideoClip or Sm2TiAudioClip)
     """
+    if HAVE_LXML:
+        return _TRACK_CLIPS_XPATH(track)
+    
     items_element = track.find("Items")
     if items_element is None:
         return []
     
-    clips = []
-    for element in items_element.findall("Element"):
-        # Find either video or audio clip
-        clip = element.find("Sm2TiVideoClip")
-        if clip is None:
-            clip = element.find("Sm2TiAudioClip")
-        
-        if clip is not None:
-            clips.append(clip)
-    
-    return clips
+    clips = map(_get_item_clip, items_element.iterfind("Element"))
+    return [clip for clip in clips if clip is not None]
+
+
+def _get_item_clip(element: ET.Element) -> Optional[ET.Element]:
+    """
+    Get the clip of a track item: its video clip, or failing that its audio
+    clip, found in one pass over the item's children.
+    """
+    clip = None
+    for child in element:
+        if child.tag == "Sm2TiVideoClip":
+            return child
+        if clip is None and child.tag == "Sm2TiAudioClip":
+            clip = child
+    return clip
 
 
 def get_clip_property(clip: ET.Element, property_name: str) -> Optional[str]:
@@ -171,7 +313,73 @@ def get_clip_property(clip: ET.Element, property_name: str) -> Optional[str]:
     Returns:
         Property value as string, or None if not found
     """
-    element = clip.find(property_name)
+    return get_element_text(clip.find(property_name))
+
+
+def index_clip(clip: ET.Element) -> Dict[str, ET.Element]:
+    """
+    Index a clip's property elements by tag in a single pass over its children.
+    Callers reading several properties of the same clip should index it once
+    and look properties up in the dictionary, instead of calling
+    get_clip_property (a linear search) for each one.
+    
+    Args:
+        clip: Clip element (Sm2TiVideoClip or Sm2TiAudioClip)
+        
+    Returns:
+        Dictionary of tag to element; if a tag repeats, the first element
+        wins (as with clip.find)
+    """
+    index = {}
+    for child in clip:
+        index.setdefault(child.tag, child)
+    return index
+
+
+def get_clip_elements(clip: ET.Element, property_names: Iterable[str]) -> Dict[str, ET.Element]:
+    """
+    Get several property elements from a clip element in a single pass over its children.
+    
+    Args:
+        clip: Clip element (Sm2TiVideoClip or Sm2TiAudioClip)
+        property_names: Names of the properties to collect
+        
+    Returns:
+        Dictionary of property name to element. Missing properties are omitted.
+    """
+    index = index_clip(clip)
+    return {name: index[name] for name in property_names if name in index}
+
+
+def get_clip_properties(clip: ET.Element, property_names: Iterable[str]) -> Dict[str, str]:
+    """
+    Get several property values from a clip element in a single pass over its children.
+    
+    Args:
+        clip: Clip element (Sm2TiVideoClip or Sm2TiAudioClip)
+        property_names: Names of the properties to collect
+        
+    Returns:
+        Dictionary of property name to value. Missing properties are omitted,
+        self-closing ones map to an empty string.
+    """
+    return {
+        name: get_element_text(element)
+        for name, element in get_clip_elements(clip, property_names).items()
+    }
+
+
+def get_element_text(element: Optional[ET.Element]) -> Optional[str]:
+    """
+    Get the value of a property element.
+    
+    Args:
+        element: Property element (e.g., <Start>), or None
+        
+    Returns:
+        Element text, empty string if the element is self-closing, or None if
+        there is no element
+    """
     if element is None:
         return None
     
@@ -188,7 +396,17 @@ def set_clip_property(clip: ET.Element, property_name: str, value: str) -> None:
         property_name: Name of the property (e.g., "Start", "Duration", "In")
         value: New value as string
     """
-    element = clip.find(property_name)
+    set_element_text(clip.find(property_name), value)
+
+
+def set_element_text(element: Optional[ET.Element], value: str) -> None:
+    """
+    Set the value of a property element. Does nothing if there is no element.
+    
+    Args:
+        element: Property element (e.g., <Start>), or None
+        value: New value as string
+    """
     if element is not None:
         element.text = value
 
@@ -205,10 +423,26 @@ def parse_int_property(clip: ET.Element, property_name: str, default: int = 0) -
     Returns:
         Integer value
     """
-    value = get_clip_property(clip, property_name)
+    return parse_int(get_clip_property(clip, property_name), default)
+
+
+def parse_int(value: Optional[str], default: int = 0) -> int:
+    """
+    Parse an integer property value, with default for empty/missing values.
+    
+    Args:
+        value: Property value as returned by get_clip_property
+        default: Default value if value is missing, empty or not an integer
+        
+    Returns:
+        Integer value
+    """
     if value is None or value == "":
         return default
     
+    # int() stays inside the try even for plain digit strings: it still
+    # raises ValueError past sys.get_int_max_str_digits(), and a try that
+    # doesn't raise costs nothing on Python 3.11+
     try:
         return int(value)
     except ValueError:
@@ -225,7 +459,20 @@ def get_timeline_info(xml_path: str) -> dict:
     Returns:
         Dictionary with timeline information
     """
-    tree = load_timeline_xml(xml_path)
+    return get_timeline_info_from_tree(load_timeline_xml(xml_path), xml_path)
+
+
+def get_timeline_info_from_tree(tree: ET.ElementTree, xml_path: Optional[str] = None) -> dict:
+    """
+    Extract basic information about an already parsed timeline.
+    
+    Args:
+        tree: Parsed sequence XML
+        xml_path: Where the tree was read from, if anywhere (reported as-is)
+        
+    Returns:
+        Dictionary with timeline information (see get_timeline_info)
+    """
     root = tree.getroot()
     
     video_track = get_video_track(root)
@@ -252,6 +499,9 @@ if __name__ == "__main__":
     import sys
     from drp_io import unpack_drp, cleanup_temp
     
+    # Show the modules' progress messages
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     if len(sys.argv) < 2:
         print("Usage: python resolve_parse.py <path_to_drp_file>")
         print("This will test XML parsing of timeline files")
@@ -265,11 +515,11 @@ if __name__ == "__main__":
     try:
         # Extract DRP
         print("1. Extracting DRP...")
-        temp_dir = unpack_drp(drp_file)
+        temp_dir, members = unpack_drp(drp_file)
         
         # Find sequence files
         print("\n2. Finding sequence files...")
-        seq_files = find_sequence_files(temp_dir)
+        seq_files = find_sequence_files(temp_dir, members)
         print(f"   Found {len(seq_files)} sequence file(s):")
         for seq_file in seq_files:
             print(f"   - {Path(seq_file).name}")